@@ -0,0 +1,147 @@
+"""Contains the BlockStorage class used by the block words"""
+
+import ctypes
+import mmap
+import os
+from collections import OrderedDict
+from typing import Optional
+
+
+class BlockStorage:
+    """Memory mapped block file with an LRU pool of block buffers"""
+
+    BLOCK_SIZE = 1024
+
+    def __init__(self, path:str, buffers:int=8) -> None:
+        if buffers < 1:
+            raise ValueError("At least one block buffer is needed")
+        self.path = path
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self.file = open(path, mode)  # pylint: disable=R1732
+        self.map:Optional[mmap.mmap] = None
+        if os.fstat(self.file.fileno()).st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0)
+
+        self.pool = bytearray(self.BLOCK_SIZE * buffers)
+        self.base = ctypes.addressof((ctypes.c_char * len(self.pool)).from_buffer(self.pool))
+        self.slots:OrderedDict[int, int] = OrderedDict()
+        self.free = list(range(buffers))[::-1]
+        self.dirty:set[int] = set()
+        self.current:Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"<BlockStorage {self.path} {len(self.slots)}/{self.buffers()}>"
+
+    def buffers(self) -> int:
+        """Returns the number of block buffers in the pool"""
+        return len(self.pool) // self.BLOCK_SIZE
+
+    def size(self) -> int:
+        """Returns the number of blocks stored in the file"""
+        return len(self.map) // self.BLOCK_SIZE if self.map is not None else 0
+
+    def contains(self, address:int, length:int=1) -> bool:
+        """Returns True if the address range lies inside the buffer pool"""
+        return self.base <= address and address + length <= self.base + len(self.pool)
+
+    def view(self, address:int, length:int=1) -> memoryview:
+        """Returns a memoryview of the pool at the passed address"""
+        offset = address - self.base
+        return memoryview(self.pool)[offset:offset+length]
+
+    def locate(self, address:int) -> tuple[bytearray, int]:
+        """Returns the buffer and the offset of the address in it"""
+        return self.pool, address - self.base
+
+    def block(self, number:int) -> int:
+        """Assigns a buffer to the block, reading it from the file, and returns its address"""
+        return self.assign(number, read=True)
+
+    def buffer(self, number:int) -> int:
+        """Assigns a buffer to the block without reading it and returns its address"""
+        return self.assign(number, read=False)
+
+    def assign(self, number:int, read:bool) -> int:
+        """Returns the address of the buffer holding the block, loading it if needed"""
+        slot = self.slots.get(number)
+        if slot is not None:
+            self.slots.move_to_end(number)
+        else:
+            if not self.free:
+                self.evict()
+            slot = self.free.pop()
+            self.slots[number] = slot
+            if read:
+                self.read(number, slot)
+        self.current = number
+        return self.base + slot * self.BLOCK_SIZE
+
+    def read(self, number:int, slot:int) -> None:
+        """Copies the block from the mapped file into the buffer, blanks past the end"""
+        start = slot * self.BLOCK_SIZE
+        buffer = memoryview(self.pool)[start:start+self.BLOCK_SIZE]
+        offset = number * self.BLOCK_SIZE
+        length = len(self.map) if self.map is not None else 0
+        stored = max(0, min(self.BLOCK_SIZE, length - offset))
+        buffer[:stored] = self.map[offset:offset+stored] if stored else b""
+        buffer[stored:] = b" " * (self.BLOCK_SIZE - stored)
+
+    def write(self, number:int) -> None:
+        """Writes the buffer of the block back to the mapped file"""
+        end = (number + 1) * self.BLOCK_SIZE
+        if self.map is None:
+            self.file.truncate(end)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        elif len(self.map) < end:
+            self.map.resize(end)
+        start = self.slots[number] * self.BLOCK_SIZE
+        self.map[end-self.BLOCK_SIZE:end] = self.pool[start:start+self.BLOCK_SIZE]
+        self.dirty.discard(number)
+
+    def evict(self) -> None:
+        """Frees the least recently used buffer, writing it back if dirty"""
+        number, slot = next(iter(self.slots.items()))
+        if number in self.dirty:
+            self.write(number)
+        del self.slots[number]
+        self.free.append(slot)
+        if self.current == number:
+            self.current = None
+
+    def update(self) -> bool:
+        """Marks the current block as modified, returns False if there is none"""
+        if self.current is None:
+            return False
+        self.dirty.add(self.current)
+        return True
+
+    def save(self) -> None:
+        """Writes all the modified buffers back to the file"""
+        for number in sorted(self.dirty):
+            self.write(number)
+        if self.map is not None:
+            self.map.flush()
+
+    def empty(self) -> None:
+        """Unassigns all the buffers without writing them back"""
+        self.free = list(range(self.buffers()))[::-1]
+        self.slots.clear()
+        self.dirty.clear()
+        self.current = None
+
+    def flush(self) -> None:
+        """Saves and then unassigns all the buffers"""
+        self.save()
+        self.empty()
+
+    def text(self, number:int) -> str:
+        """Returns the block as text to be interpreted"""
+        address = self.block(number)
+        return self.view(address, self.BLOCK_SIZE).tobytes().decode("latin-1").replace("\0", " ")
+
+    def close(self) -> None:
+        """Flushes the buffers and closes the file"""
+        self.flush()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
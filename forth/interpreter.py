@@ -3,20 +3,218 @@
 
 # do loop begin until again leave exit recurse +loop then endif if else see
 
+import atexit
+import re
+import time
+from array import array
 from typing import Optional, Union
-from forth.utils import Stack, SymbolTable, Number, Node, Nodes, Error, Token
+from forth.utils import Stack, SymbolTable, Number, Node, Nodes, Error, Token, Task, ForthError, Limits, DataSpace
+from forth.block import BlockStorage
+from forth.metrics import Metrics
 
 
 class Interpreter:
     """Interprets the text"""
 
     stack  = Stack()
+    fstack = array("d")
     variables = SymbolTable()
-    error = None
+    rstack:list[list] = []
+    blocks:Optional[BlockStorage] = None
+    dataspace = DataSpace()
+    tasks:list[Task] = []
+    current_task:Optional[Task] = None
+    nesting:int = 0
+    compiling:int = 0
+    limits = Limits()
+    executed:int = 0
+    next_check:int = 0
+    deadline:Optional[float] = None
+    limited:bool = False
+    metrics = Metrics()
     tokens:list[Token] = []
     tok_idx:int = 0
     current_tok:Token = None
 
+    @classmethod
+    def open_blocks(cls, path:str, buffers:int=8) -> BlockStorage:
+        """Uses the file at path for the block words with the given amount of buffers,
+        the buffers are written back when the process exits"""
+        cls.close_blocks()
+        cls.blocks = BlockStorage(path, buffers)
+        atexit.unregister(cls.close_blocks)
+        atexit.register(cls.close_blocks)
+        return cls.blocks
+
+    @classmethod
+    def close_blocks(cls) -> None:
+        """Writes back and closes the block file in use"""
+        if cls.blocks is not None:
+            cls.blocks.close()
+            cls.blocks = None
+
+    @classmethod
+    def locate(cls, node:Node, address:int, length:int=1) -> tuple[bytearray, int]:
+        """Returns the buffer holding the address range and its offset, or raises error"""
+        if length >= 0:
+            if cls.dataspace.contains(address, length):
+                return cls.dataspace.locate(address)
+            if cls.blocks is not None and cls.blocks.contains(address, length):
+                return cls.blocks.locate(address)
+        return cls.raise_error(node, Error.InvalidMemoryAddress)
+
+    @classmethod
+    def set_dataspace(cls, size:int) -> DataSpace:
+        """Replaces the data space with one of the passed size, do this before defining words"""
+        cls.dataspace = DataSpace(size)
+        return cls.dataspace
+
+    @classmethod
+    def memory(cls, node:Node, address:int, length:int=1) -> memoryview:
+        """Returns a memoryview of the data space or block buffer at the address"""
+        buffer, offset = cls.locate(node, address, length)
+        return memoryview(buffer)[offset:offset+length]
+
+    @classmethod
+    def add_task(cls, name:str) -> Task:
+        """Creates a new stopped task and returns it"""
+        task = Task(name)
+        cls.tasks.append(task)
+        return task
+
+    @classmethod
+    def find_task(cls, address:int) -> Optional[Task]:
+        """Returns the task at the passed address"""
+        for task in cls.tasks:
+            if task.id_ == address:
+                return task
+        return None
+
+    @classmethod
+    def start_limits(cls) -> None:
+        """Starts counting the instructions and time of a new evaluation"""
+        cls.executed = 0
+        cls.next_check = 0
+        cls.deadline = None
+        if cls.limits.seconds is not None:
+            cls.deadline = time.monotonic() + cls.limits.seconds
+        cls.limited = cls.limits.bounded()
+
+    @classmethod
+    def fpush(cls, value:float) -> None:
+        """Pushes the value on the floating-point stack, keeping its high-water mark"""
+        cls.fstack.append(value)
+        if len(cls.fstack) > cls.metrics.fstack_high:
+            cls.metrics.fstack_high = len(cls.fstack)
+
+    @classmethod
+    def update_metrics(cls) -> None:
+        """Adds the stack high-water marks and the dictionary sizes to the metrics"""
+        cls.metrics.stack_high = max(cls.metrics.stack_high, cls.stack.high,
+                                     *(task.stack.high for task in cls.tasks))
+        cls.metrics.dictionary_words = len(Word.words)
+        cls.metrics.symbol_table = len(cls.variables) + len(cls.variables.nameless)
+
+    @classmethod
+    def check_limits(cls, node:Node) -> None:
+        """Counts the node and raises an error if the evaluation went over one of its limits"""
+        cls.executed += 1
+        limits = cls.limits
+        if cls.stack.length > limits.stack_depth:
+            cls.raise_error(node, Error.StackOverFlow)
+        if len(cls.fstack) > limits.stack_depth:
+            cls.raise_error(node, Error.FloatStackOverFlow)
+        if cls.executed < cls.next_check:
+            return
+        cls.next_check = 0
+        if limits.instructions is not None and cls.executed > limits.instructions:
+            cls.raise_error(node, Error.InstructionLimit)
+        if cls.deadline is not None and time.monotonic() > cls.deadline:
+            cls.raise_error(node, Error.TimeLimit)
+        cls.next_check = cls.executed + limits.check_every
+        if limits.instructions is not None:
+            cls.next_check = min(cls.next_check, limits.instructions + 1)
+
+    @classmethod
+    def check_memory(cls, index:tuple[int, int], size:int=1) -> None:
+        """Raises an error if there is no room left for another definition or size bytes,
+        every definition and every byte of data space in use counts as one"""
+        if cls.limits.memory is None:
+            return
+        used = len(cls.variables) + len(cls.variables.nameless) + len(Word.words)
+        if used + cls.dataspace.used() + size > cls.limits.memory:
+            cls.raise_error(Node(Token(Token.TT_WORD, index), Node.WordNode),
+                            Error.DictionaryOverFlow)
+
+    @classmethod
+    def step(cls) -> list[Union[str, tuple[Task, Error]]]:
+        """Runs every active task once until it pauses or finishes, round-robin,
+        errors are returned together with their task"""
+        cls.start_limits()
+        result = cls.run_tasks()
+        cls.update_metrics()
+        return result
+
+    @classmethod
+    def run_tasks(cls) -> list[Union[str, tuple[Task, Error]]]:
+        """Runs every active task once, without starting a new evaluation"""
+        result = []
+        for task in [task for task in cls.tasks if task.active()]:
+            if task is not cls.current_task:
+                result.extend(cls.run_task(task))
+        return result
+
+    @classmethod
+    def run_task(cls, task:Task) -> list[Union[str, tuple[Task, Error]]]:
+        """Runs the task until it pauses or finishes and returns its output"""
+        outer = cls.stack, cls.fstack, cls.rstack, cls.current_task, cls.nesting
+        cls.stack, cls.fstack, cls.rstack, cls.current_task, cls.nesting = \
+            task.stack, task.fstack, task.rstack, task, 0
+        task.paused = False
+        result = []
+        try:
+            while cls.rstack and not task.paused:
+                frame = cls.rstack[-1]
+                if frame[1] >= len(frame[0]):
+                    cls.rstack.pop()
+                    continue
+                node = frame[0][frame[1]]
+                frame[1] += 1
+                try:
+                    if (body := cls.user_word(node)) is not None:
+                        if frame[1] >= len(frame[0]):
+                            cls.rstack.pop()
+                        if len(cls.rstack) >= cls.limits.rstack_depth:
+                            cls.raise_error(node, Error.ReturnStackOverFlow)
+                        cls.rstack.append([body, 0])
+                        cls.metrics.user_words += 1
+                        cls.metrics.rstack_high = max(cls.metrics.rstack_high, len(cls.rstack))
+                        continue
+                    result.append(cls.visit(node))
+                except Exception as exc:  # pylint: disable=W0703
+                    if not isinstance(exc, ForthError):
+                        exc = cls.internal_error(node, exc)
+                    result.extend(exc.output)
+                    task.error = exc.error
+                    result.append((task, exc.error))
+                    task.rstack.clear()
+                    cls.stack.clear()
+                    del cls.fstack[:]
+                cls.rstack = task.rstack
+        finally:
+            cls.stack, cls.fstack, cls.rstack, cls.current_task, cls.nesting = outer
+        return [value for value in result if value]
+
+    @classmethod
+    def user_word(cls, node:Node) -> Optional[list[Node]]:
+        """Returns the body of the node if it calls a user-defined word"""
+        if node.type != Node.WordNode:
+            return None
+        name = node.tok.name
+        if cls.variables.get(name) is not None or BuiltInWord.hasmethod(name)[0]:
+            return None
+        return Word.words.get(name)
+
     @classmethod
     def filter_text(cls, text:str) -> dict[tuple[int, int], str]:
         """Filters the text by removing whitespaces"""
@@ -45,18 +243,26 @@ class Interpreter:
         tokens:list[Token] = []
         comment = False
         string = None
+        string_word = None
         variable = False
         word = [None, None]
 
         for index, part in parts.items():
-            if variable == "variable":
-                val = Number(0)
+            if variable:
+                cls.check_memory(index)
+            if variable in ("variable", "fvariable"):
+                val = Number(0.0 if variable == "fvariable" else 0)
                 cls.variables.add({part:Number(val.id_)}, (val,))
+                variable = False
             elif variable == "constant":
                 if cls.stack.isempty():
-                    cls.raise_error(None ,Error.StackUnderFlow)
-                    return tokens
+                    cls.raise_error(Node(Token(Token.TT_WORD, index), Node.WordNode),
+                                    Error.StackUnderFlow)
                 cls.variables.add({part:cls.stack.pop()})
+                variable = False
+            elif variable == "task":
+                cls.variables.add({part:Number(cls.add_task(part).id_)})
+                variable = False
             elif part == "\\" and string is None:
                 break
             elif (part.endswith(")") and comment or part == ")") and string is None:
@@ -66,21 +272,32 @@ class Interpreter:
 
             elif part == ":" and string is None:
                 word[1] = ""
-            elif part == ";" and word[0] and word[1] and string is None:
-                Word(*word)
+            elif part == ";" and word[0] and text[word[1]:index[0]].strip() and string is None:
+                cls.check_memory(index)
+                Word(word[0], text[word[1]:index[0]])
+                word = [None, None]
             elif word != [None, None] and string is None:
-                word = [part, word[1]] if word[0] is None else [word[0]," " + part]
+                if word[0] is None:
+                    word = [part, index[1]]
 
-            elif part == ".\"":
+            elif part in (".\"", "s\"", "S\"") and string is None:
                 string = index[1]
+                string_word = part.lower()
             elif string is not None and part.endswith("\""):
-                tokens.append(Token(Token.TT_STRING, (string, index[1]-1)))
+                if string_word == "s\"":
+                    tokens.append(cls.make_sstring(text, (string, index[1]), index))
+                else:
+                    tokens.append(Token(Token.TT_STRING, (string, index[1]-1)))
                 string = None
+            elif string is not None:
+                continue
 
-            elif part == "variable" or part == "constant":
+            elif part in ("variable", "fvariable", "constant", "task"):
                 variable = part
             # elif part in Token.compile_only:
             #     tokens.append(Token(Token.TT_COMPILE, part, index))
+            elif cls.float_re.match(part):
+                tokens.append(Token(Token.TT_FLOAT, index, cls.make_float(part)))
             elif all(char in "0123456789-." for char in part):
                 tokens = cls.make_number(part, tokens, index)
             else:
@@ -89,6 +306,27 @@ class Interpreter:
         tokens.append(Token(Token.TT_EOF, (len(text)-1,)*2))
         return tokens
 
+    float_re = re.compile(r"^[+-]?[0-9]+(\.[0-9]*)?[eE][+-]?[0-9]*$")
+
+    @staticmethod
+    def make_float(part:str) -> float:
+        """Converts a forth float literal like 1.5e or -2e-3 to a float"""
+        if part[-1] in "eE+-":
+            part += "0"
+        return float(part)
+
+    @classmethod
+    def make_sstring(cls, text:str, pos:tuple[int, int], index:tuple[int, int]) -> Token:
+        """Copies the s" literal into the data space once and makes its Token,
+        literals outside definitions only last until the next eval"""
+        data = text[pos[0]+1:pos[1]-1].encode()
+        cls.check_memory(index, len(data))
+        address = cls.dataspace.allot(data, transient=not cls.compiling)
+        if address is None:
+            cls.raise_error(Node(Token(Token.TT_WORD, index), Node.WordNode),
+                            Error.DictionaryOverFlow)
+        return Token(Token.TT_SSTRING, pos, (address, len(data)))
+
     @staticmethod
     def make_number(part:str, tokens:list[Token], index:tuple[int, int]) -> list[Token]:
         """Makes a number Token"""
@@ -134,6 +372,10 @@ class Interpreter:
                 res.append(Node(tok, Node.NumberNode))
             elif tok.type == Token.TT_WORD:
                 res.append(Node(tok, Node.WordNode))
+            elif tok.type == Token.TT_FLOAT:
+                res.append(Node(tok, Node.FloatNode))
+            elif tok.type == Token.TT_SSTRING:
+                res.append(Node(tok, Node.SStringNode))
             elif tok.type == Token.TT_STRING:
                 res.append(Node(tok, Node.StringNode))
             else:
@@ -145,7 +387,10 @@ class Interpreter:
         """Returns the value of the passed Node"""
         method_name = f'visit_{node.type}'
         method = getattr(cls, method_name, cls.no_visit_method)
-        return method(node)
+        result = method(node)
+        if cls.limited:
+            cls.check_limits(node)
+        return result
 
     @staticmethod
     def no_visit_method(node:Node) -> None:
@@ -157,11 +402,22 @@ class Interpreter:
         """Adds the Number to the stack"""
         cls.stack.push(Number(node.tok.value))
 
+    @classmethod
+    def visit_float_node(cls, node:Node) -> None:
+        """Adds the float to the floating-point stack"""
+        cls.fpush(node.tok.value)
+
+    @classmethod
+    def visit_sstring_node(cls, node:Node) -> None:
+        """Adds the address and length of the string to the stack"""
+        address, length = node.tok.value
+        cls.stack.push(Number(address), Number(length))
+
     @classmethod
     def visit_word_node(cls, node:Node) -> Optional[str]:
         """Word Node"""
 
-        var:Optional[Number] = cls.variables.get(node.tok.value.lower())
+        var:Optional[Number] = cls.variables.get(node.tok.name)
 
         if var is None:
             return Word.execute(cls, node.tok, node=node, name="var")
@@ -177,20 +433,57 @@ class Interpreter:
     @classmethod
     def visit_nodes(cls, nodes:Nodes) -> list[Union[None, str, Error]]:
         """Returns a list with all the evaluated nodes"""
+        try:
+            return cls.execute_nodes(nodes.nodes)
+        except ForthError as exc:
+            cls.stack.clear()
+            del cls.fstack[:]
+            return exc.output + [exc.error]
+
+    @classmethod
+    def execute_nodes(cls, nodes:list[Node]) -> list[Optional[str]]:
+        """Evaluates the nodes in a new return stack frame, errors are raised as ForthError"""
         result = []
-        for node in nodes.nodes:
-            result.append(cls.visit(node))
-            if cls.error:
-                result[-1] = cls.error
-                cls.error = None
-                break
+        depth = len(cls.rstack)
+        if depth >= cls.limits.rstack_depth:
+            frame = cls.rstack[-1]
+            cls.raise_error(frame[0][frame[1]-1], Error.ReturnStackOverFlow)
+        frame = [nodes, 0]
+        cls.rstack.append(frame)
+        cls.nesting += 1
+        if depth >= cls.metrics.rstack_high:
+            cls.metrics.rstack_high = depth + 1
+        try:
+            while frame[1] < len(nodes):
+                node = nodes[frame[1]]
+                frame[1] += 1
+                result.append(cls.visit(node))
+        except RecursionError:
+            cls.raise_error(node, Error.ReturnStackOverFlow)
+        except ForthError as exc:
+            exc.output[:0] = filter(None, result)
+            raise
+        except Exception as exc:  # pylint: disable=W0703
+            error = cls.internal_error(node, exc)
+            error.output[:0] = filter(None, result)
+            raise error from exc
+        finally:
+            del cls.rstack[depth:]
+            cls.nesting -= 1
         return result
 
     @classmethod
-    def raise_error(cls, node:Node, error:str) -> None:
-        """Returns the error after clearing the stack"""
-        cls.stack.clear()
-        cls.error = Error(node.tok, error)
+    def raise_error(cls, node:Node, error:str, code:Optional[int]=None) -> None:
+        """Raises the error as a ForthError to be caught by catch or eval"""
+        cls.metrics.error(error if error in Error.codes else "other")
+        raise ForthError(Error(node.tok, error, code))
+
+    @classmethod
+    def internal_error(cls, node:Node, exc:Exception) -> ForthError:
+        """Returns the unexpected exception raised by the node as a ForthError"""
+        cls.metrics.error(Error.InternalError)
+        error = f"{Error.InternalError}: {type(exc).__name__}: {exc}"
+        return ForthError(Error(node.tok, error, Error.codes[Error.InternalError]))
 
     @classmethod
     def eval(cls, text:str) -> tuple[Optional[filter], Optional[Error], str]:
@@ -198,8 +491,23 @@ class Interpreter:
         if not text.strip():
             return None, None, "ok"
         Error.text = text
-        nodes = cls.parse(text)
-        value = cls.visit(nodes)
+        cls.dataspace.release()
+        cls.start_limits()
+        cls.metrics.evaluations += 1
+        cls.metrics.parses += 1
+        start = time.perf_counter()
+        compiling = cls.metrics.compile_seconds
+        try:
+            nodes = cls.parse(text)
+        except ForthError as exc:
+            cls.stack.clear()
+            cls.update_metrics()
+            return None, exc.error, ""
+        finally:
+            compiling = cls.metrics.compile_seconds - compiling
+            cls.metrics.parse_seconds += time.perf_counter() - start - compiling
+        value = cls.visit_nodes(nodes)
+        cls.update_metrics()
         error = None
         status = "ok"
         if value and isinstance(value[-1], Error):
@@ -213,4 +521,4 @@ class Interpreter:
         return filter(None, value), error, status
 
 
-from forth.word import Word
+from forth.word import Word, BuiltInWord
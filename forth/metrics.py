@@ -0,0 +1,103 @@
+"""Contains the Metrics class used to observe the Interpreter"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union
+
+
+class Metrics:
+    # pylint: disable=R0902
+
+    """Counters and high-water marks of an Interpreter"""
+
+    def __init__(self) -> None:
+        self.evaluations = 0
+        self.builtin_words = 0
+        self.user_words = 0
+        self.parses = 0
+        self.parse_seconds = 0.0
+        self.definitions = 0
+        self.compile_seconds = 0.0
+        self.stack_high = 0
+        self.fstack_high = 0
+        self.rstack_high = 0
+        self.dictionary_words = 0
+        self.symbol_table = 0
+        self.errors:dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"<Metrics {self.as_dict()}>"
+
+    def error(self, error:str) -> None:
+        """Counts an error of the passed kind, unknown throw codes are counted as other"""
+        self.errors[error] = self.errors.get(error, 0) + 1
+
+    def as_dict(self) -> dict[str, Union[int, float, dict[str, int]]]:
+        """Returns all the metrics as a dict"""
+        return {"evaluations": self.evaluations,
+                "builtin_words": self.builtin_words, "user_words": self.user_words,
+                "parses": self.parses, "parse_seconds": self.parse_seconds,
+                "definitions": self.definitions, "compile_seconds": self.compile_seconds,
+                "stack_high": self.stack_high, "fstack_high": self.fstack_high,
+                "rstack_high": self.rstack_high, "dictionary_words": self.dictionary_words,
+                "symbol_table": self.symbol_table, "errors": dict(self.errors)}
+
+    def prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text format"""
+        lines = []
+
+        def metric(name:str, kind:str, doc:str, *samples:tuple[str, Union[int, float]]) -> None:
+            lines.append(f"# HELP forth_{name} {doc}")
+            lines.append(f"# TYPE forth_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"forth_{name}{labels} {value}")
+
+        metric("evaluations_total", "counter", "Texts evaluated", ("", self.evaluations))
+        metric("words_total", "counter", "Words executed",
+               ('{kind="builtin"}', self.builtin_words), ('{kind="user"}', self.user_words))
+        metric("parses_total", "counter", "Texts parsed", ("", self.parses))
+        metric("parse_seconds_total", "counter", "Time spent parsing", ("", self.parse_seconds))
+        metric("definitions_total", "counter", "Words defined", ("", self.definitions))
+        metric("compile_seconds_total", "counter", "Time spent compiling definitions",
+               ("", self.compile_seconds))
+        metric("stack_high_water", "gauge", "Deepest data stack", ("", self.stack_high))
+        metric("fstack_high_water", "gauge", "Deepest floating-point stack",
+               ("", self.fstack_high))
+        metric("rstack_high_water", "gauge", "Deepest return stack", ("", self.rstack_high))
+        metric("dictionary_words", "gauge", "User-defined words", ("", self.dictionary_words))
+        metric("symbol_table_entries", "gauge", "Variables, constants and tasks",
+               ("", self.symbol_table))
+        metric("errors_total", "counter", "Errors raised by kind, other for unknown throw codes",
+               *((f'{{error="{error}"}}', count) for error, count in sorted(self.errors.items())))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path:str) -> None:
+        """Writes the Prometheus text to the file, replacing it in one step"""
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(temp, path)
+
+    def serve(self, port:int, host:str="127.0.0.1") -> ThreadingHTTPServer:
+        """Serves the Prometheus text on the local port from a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answers every GET with the metrics"""
+
+            def do_GET(self) -> None:  # pylint: disable=C0103
+                """Sends the metrics"""
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args) -> None:
+                """Keeps the requests out of stderr"""
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
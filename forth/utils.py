@@ -1,5 +1,8 @@
 """Contains the Stack, Error, DataClass, Token, and other classes"""
 
+import ctypes
+import sys
+from array import array
 from typing import Optional, Union
 
 
@@ -10,6 +13,8 @@ class Token:
     TT_WORD	    = 'WORD'
     TT_EOF		= 'EOF'
     TT_STRING	= 'STRING'
+    TT_FLOAT	= 'FLOAT'
+    TT_SSTRING	= 'SSTRING'
     # TT_COMPILE	= 'COMPILE'
 
     # compile_only = [
@@ -29,16 +34,23 @@ class Token:
     #     "leave"
     # ]
 
-    def __init__(self, type_:str, pos:tuple[int, int], value:Union[int, str, None]=None) -> None:
+    __slots__ = ("type", "pos", "source", "name", "_value")
+
+    def __init__(self, type_:str, pos:tuple[int, int],
+                 value:Union[int, float, str, None]=None) -> None:
         assert Token.text, "No text passed - Token"
         self.type = type_
         self.pos = pos
-        if value is not None:
-            self.value = value
-        elif self.type == Token.TT_NUMBER:
-            self.value = int(self.value)
-        else:
-            self.value = Token.text[pos[0]:pos[1]]
+        self.source = Token.text
+        self._value = value
+        self.name = sys.intern(self.value.lower()) if type_ == Token.TT_WORD else None
+
+    @property
+    def value(self) -> Union[int, float, str]:
+        """The value of the token, words and strings are sliced from the source when needed"""
+        if self._value is None:
+            return self.source[self.pos[0]:self.pos[1]]
+        return self._value
 
     def matches(self, type_:str, value:Union[int, str, None]) -> bool:
         """Return true if the given attributes match with the instance attributes"""
@@ -53,6 +65,7 @@ class Token:
 class Error:
 
     """Error Class"""
+    __slots__ = ("tok", "error", "code")
     text = ""
     error_no = 0
 
@@ -65,19 +78,52 @@ class Error:
     InterpretingCompileOnly = "Interpreting a compile-only word"
     ExpectedDest = "expected dest"
     ExpectedDoDest = "expected dest, do-dest or scope"
-
-
-    def __init__(self, tok:Token, error:str) -> None:
+    FloatStackUnderFlow = "Floating-point stack underflow"
+    FloatZeroDivision = "Floating-point divide by zero"
+    FloatInvalidArgument = "Floating-point invalid argument"
+    FloatOutOfRange = "Floating-point result out of range"
+    InvalidBlockNumber = "Invalid block number"
+    NoBlockFile = "No block file in use"
+    Aborted = "Aborted"
+    StackOverFlow = "Stack overflow"
+    ReturnStackOverFlow = "Return stack overflow"
+    DictionaryOverFlow = "Dictionary overflow"
+    FloatStackOverFlow = "Floating-point stack overflow"
+    UnsupportedOperation = "Unsupported operation"
+    InstructionLimit = "Instruction limit exceeded"
+    TimeLimit = "Time limit exceeded"
+    InternalError = "Internal error"
+
+    codes = {Aborted: -1, StackOverFlow: -3, StackUnderFlow: -4, ReturnStackOverFlow: -5,
+             DictionaryOverFlow: -8, InvalidMemoryAddress: -9, ZeroDivision: -10,
+             UndefinedWord: -13, InterpretingCompileOnly: -14, ZeroLengthName: -16,
+             UnsupportedOperation: -21, Unstructured: -22, ExpectedDest: -22,
+             ExpectedDoDest: -22, NoBlockFile: -33, InvalidBlockNumber: -35,
+             FloatZeroDivision: -42, FloatOutOfRange: -43, FloatStackOverFlow: -44,
+             FloatStackUnderFlow: -45, FloatInvalidArgument: -46, InstructionLimit: -257,
+             TimeLimit: -258, InternalError: -259}
+
+    def __init__(self, tok:Token, error:str, code:Optional[int]=None) -> None:
         assert Error.text, "No text passed - Error"
         self.tok = tok
         self.error = error
+        self.code = Error.codes.get(error, -256) if code is None else code
         Error.error_no += 1
 
+    @staticmethod
+    def message(code:int) -> str:
+        """Returns the error for the throw code"""
+        for error, error_code in Error.codes.items():
+            if error_code == code:
+                return error
+        return f"error #{code}"
+
     def __str__(self) -> str:
+        text = self.tok.source
         res = f":{Error.error_no}: {self.error}"
-        res += f"\n{Error.text[:self.tok.pos[0]]}>>>"
-        res += Error.text[self.tok.pos[0]:self.tok.pos[1]]
-        res += f"<<<{Error.text[self.tok.pos[1]:]}\n"
+        res += f"\n{text[:self.tok.pos[0]]}>>>"
+        res += text[self.tok.pos[0]:self.tok.pos[1]]
+        res += f"<<<{text[self.tok.pos[1]:]}\n"
         res += self.backtrace()
         return res
 
@@ -89,13 +135,56 @@ class Error:
         return trace
 
 
+class Limits:
+    # pylint: disable=R0903,R0913
+
+    """Limits for every evaluation, None means unlimited"""
+    check_every = 256
+    frames_per_call = 6
+
+    def __init__(self, instructions:Optional[int]=None, seconds:Optional[float]=None,
+                 stack_depth:Optional[int]=None, rstack_depth:int=128,
+                 memory:Optional[int]=None, host_words:bool=True) -> None:
+        most = (sys.getrecursionlimit() - 100) // self.frames_per_call
+        if not 1 <= rstack_depth <= most:
+            raise ValueError(f"rstack_depth has to be between 1 and {most}")
+        self.instructions = instructions
+        self.seconds = seconds
+        self.stack_depth = sys.maxsize if stack_depth is None else stack_depth
+        self.rstack_depth = rstack_depth
+        self.memory = memory
+        self.host_words = host_words
+
+    def bounded(self) -> bool:
+        """Returns True if the instructions, time or stack depth are limited"""
+        return self.instructions is not None or self.seconds is not None \
+            or self.stack_depth != sys.maxsize
+
+    def __repr__(self) -> str:
+        return (f"<Limits instructions={self.instructions} seconds={self.seconds} "
+                f"stack_depth={self.stack_depth} rstack_depth={self.rstack_depth} "
+                f"memory={self.memory} host_words={self.host_words}>")
+
+
+class ForthError(Exception):
+    """Raised with the Error when a word fails, until catch or eval handles it"""
+
+    def __init__(self, error:Error) -> None:
+        super().__init__(error.error)
+        self.error = error
+        self.output:list[str] = []
+
+
 class Node:
     # pylint: disable=R0903
 
     """A Node"""
+    __slots__ = ("tok", "type")
     NumberNode = "number_node"
     WordNode = "word_node"
     StringNode = "string_node"
+    FloatNode = "float_node"
+    SStringNode = "sstring_node"
 
     def __init__(self, tok:Token, type_:str) -> None:
         self.tok = tok
@@ -109,6 +198,7 @@ class Nodes:
     # pylint: disable=R0903
 
     """Node containing multiple Node objects"""
+    __slots__ = ("nodes",)
     type = "nodes"
 
     def __init__(self, nodes:list[Node]) -> None:
@@ -120,7 +210,8 @@ class Nodes:
 
 class Number:
     """Stores a number or a variable"""
-    def __init__(self, value:int=0) -> None:
+    __slots__ = ("value", "id_")
+    def __init__(self, value:Union[int, float]=0) -> None:
         self.value = value
         self.id_ = id(self)
 
@@ -161,9 +252,12 @@ class Stack:
     def __init__(self) -> None:
         self.head=None
         self.tail=None
+        self.length = 0
+        self.high = 0
 
     def pop(self, amount=1) -> Union[Number, tuple[Number, ...]]:
         """Pops the top value and returns it"""
+        self.length -= amount
         result = []
         for _ in range(amount):
             current = self.head
@@ -175,6 +269,9 @@ class Stack:
         """Pushes the value on top of the stack"""
         if not datas:
             raise Exception("No data passed")
+        self.length += len(datas)
+        if self.length > self.high:
+            self.high = self.length
 
         new_node = [datas[0], None]
         if self.head and self.tail:
@@ -195,12 +292,7 @@ class Stack:
 
     def size(self) -> int:
         """Returns the size of the stack"""
-        current = self.head
-        count = 0
-        while current:
-            count +=1
-            current = current[1]
-        return count
+        return self.length
 
     def isempty(self) -> bool:
         """Returns true if the stack is empty"""
@@ -223,6 +315,15 @@ class Stack:
         while self.head is not None:
             self.head = self.head[1]
         self.tail = None
+        self.length = 0
+
+    def mark(self) -> tuple[Optional[list], Optional[list], int]:
+        """Returns the current state of the stack to be reset to later"""
+        return self.head, self.tail, self.length
+
+    def reset(self, mark:tuple[Optional[list], Optional[list], int]) -> None:
+        """Resets the stack to a state returned by mark"""
+        self.head, self.tail, self.length = mark
 
     def iter(self) -> list[Number, Optional[list]]:
         """Iterates through the linked list returning the node(list)"""
@@ -259,3 +360,79 @@ class SymbolTable(dict):
     def remove(self, name:str) -> None:
         """Removes the passed name from the table"""
         del self[name]
+
+
+class Task:
+    """A cooperative task with its own stacks and instruction pointer"""
+
+    def __init__(self, name:str) -> None:
+        self.name = name
+        self.stack = Stack()
+        self.fstack = array("d")
+        self.rstack:list[list] = []
+        self.paused = False
+        self.error:Optional[Error] = None
+        self.id_ = id(self)
+
+    def __repr__(self) -> str:
+        return f"<Task {self.name} {'active' if self.active() else 'stopped'}>"
+
+    def activate(self, nodes:list[Node]) -> None:
+        """Clears the stacks and makes the task run the passed nodes"""
+        self.stack.clear()
+        del self.fstack[:]
+        self.rstack = [[nodes, 0]]
+        self.error = None
+
+    def stop(self) -> None:
+        """Makes the task finish all the words it is executing"""
+        for frame in self.rstack:
+            frame[1] = len(frame[0])
+        self.paused = True
+
+    def active(self) -> bool:
+        """Returns true if the task has something left to execute"""
+        return any(frame[1] < len(frame[0]) for frame in self.rstack)
+
+
+class DataSpace:
+    """Contiguous bytes for strings, addressed by their real memory address"""
+
+    def __init__(self, size:int=65536) -> None:
+        self.data = bytearray(size)
+        self.base = ctypes.addressof((ctypes.c_char * size).from_buffer(self.data))
+        self.here = 0
+        self.top = size
+
+    def __repr__(self) -> str:
+        return f"<DataSpace {self.used()}/{len(self.data)}>"
+
+    def used(self) -> int:
+        """Returns the number of bytes in use"""
+        return self.here + len(self.data) - self.top
+
+    def allot(self, data:bytes, transient:bool=False) -> Optional[int]:
+        """Copies the bytes into the data space, returns their address or None if full,
+        transient bytes are taken from the top and freed by release"""
+        if self.here + len(data) > self.top:
+            return None
+        if transient:
+            self.top -= len(data)
+            start = self.top
+        else:
+            start = self.here
+            self.here += len(data)
+        self.data[start:start+len(data)] = data
+        return self.base + start
+
+    def release(self) -> None:
+        """Frees all the transient bytes"""
+        self.top = len(self.data)
+
+    def contains(self, address:int, length:int=1) -> bool:
+        """Returns True if the address range lies inside the data space"""
+        return self.base <= address and address + length <= self.base + len(self.data)
+
+    def locate(self, address:int) -> tuple[bytearray, int]:
+        """Returns the buffer and the offset of the address in it"""
+        return self.data, address - self.base
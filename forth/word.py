@@ -1,19 +1,31 @@
 """Contains the BuiltInWord class"""
 # pylint: disable=R0401
 
+import math
 import sys
+import time
 from typing import Optional, Callable
-from forth.utils import Number, Error, Token
+from forth.utils import Number, Error, Token, ForthError
 from forth.interpreter import Interpreter
 
 
 class Word:
     """Contains User-defined Words"""
     words = {}
+    xts:dict[int, Token] = {}
 
     def __init__(self, name:str, body:str) -> None:
         self.name = name
-        Word.words[name] = Interpreter.parse(body).nodes
+        text = Token.text
+        start = time.perf_counter()
+        Interpreter.compiling += 1
+        try:
+            Word.words[name.lower()] = Interpreter.parse(body).nodes
+        finally:
+            Interpreter.compiling -= 1
+        Interpreter.metrics.compile_seconds += time.perf_counter() - start
+        Interpreter.metrics.definitions += 1
+        Token.text = text
 
     def __repr__(self) -> str:
         return str(self.name)
@@ -21,17 +33,18 @@ class Word:
     @classmethod
     def execute(cls, ecls:Interpreter, wordtok:Token, **kwargs) -> Optional[str]:
         """Executes words, if the word is in built, calls the BuiltInWord class"""
-        if (method := BuiltInWord.hasmethod(wordtok.value.lower()))[0]:
+        if (method := BuiltInWord.hasmethod(wordtok.name))[0]:
+            ecls.metrics.builtin_words += 1
             return method[1](ecls, kwargs)
-        body = Word.words.get(wordtok.value.lower())
+        body = Word.words.get(wordtok.name)
         if body is None:
             return ecls.raise_error(kwargs["node"], Error.UndefinedWord)
-        results = []
-        for node in body:
-            results.append(ecls.visit(node))
-            if ecls.error:
-                ecls.error.tok = wordtok
-                break
+        ecls.metrics.user_words += 1
+        try:
+            results = ecls.execute_nodes(body)
+        except ForthError as exc:
+            exc.error.tok = kwargs["node"].tok
+            raise
         return " ".join(filter(None, results))
 
 
@@ -43,7 +56,12 @@ class BuiltInWord:
     words = {".":"dot", "?":"value", "!":"assign", ".s":"show_stack",
             "2drop":"drop_two", "+":"plus", "-":"minus", "*":"mul", "/":"div",
             "/mod":"moddiv", "=":"equals", "<":"greater", ">":"less", "@":"put",
-            "+!":"plusassign", ".4":"dotfour", "cr":"carriage"}
+            "+!":"plusassign", ".4":"dotfour", "cr":"carriage", "f+":"fplus",
+            "f-":"fminus", "f*":"fmul", "f/":"fdiv", "f.":"fdot", "f.s":"show_fstack",
+            "f@":"fput", "f!":"fassign", "s>f":"int_to_float", "f>s":"float_to_int",
+            "save-buffers":"save_buffers", "empty-buffers":"empty_buffers",
+            "c@":"cput", "c!":"cassign", "'":"tick", "/string":"slash_string",
+            "-trailing":"dash_trailing"}
 
     @classmethod
     def hasmethod(cls, method:str) -> tuple[bool, Callable[[Interpreter, dict], Optional[str]]]:
@@ -72,8 +90,11 @@ class BuiltInWord:
         return str(ecls.stack)
 
     @staticmethod
-    def bye(_ecls:Interpreter, _kwargs:dict) -> None:
+    def bye(ecls:Interpreter, kwargs:dict) -> None:
         """Executes bye word"""
+        if not ecls.limits.host_words:
+            return ecls.raise_error(kwargs["node"], Error.UnsupportedOperation)
+        ecls.close_blocks()
         sys.exit()
 
     @staticmethod
@@ -101,7 +122,7 @@ class BuiltInWord:
     @staticmethod
     def drop_two(ecls:Interpreter, kwargs:dict) -> None:
         """Executes 2drop word"""
-        if ecls.stack.isempty():
+        if ecls.stack.size() < 2:
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
         ecls.stack.pop(2)
         return None
@@ -109,14 +130,10 @@ class BuiltInWord:
     @staticmethod
     def rot(ecls:Interpreter, kwargs:dict) -> None:
         """Executes rot word"""
-        if ecls.stack.isempty():
+        if ecls.stack.size() < 3:
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
-        for item in ecls.stack.iter():
-            if item is not ecls.stack.tail:
-                prev = item
-        last = prev[1]
-        prev[1] = None
-        return ecls.stack.push(last[0])
+        var1, var2, var3 = ecls.stack.pop(3)
+        return ecls.stack.push(var2, var1, var3)
 
     @staticmethod
     def mul(ecls:Interpreter, kwargs:dict) -> None:
@@ -207,15 +224,21 @@ class BuiltInWord:
         var1, var2 = ecls.stack.pop(2)
         return ecls.stack.push(Number(-1 if var1 > var2 else 0))
 
+    @staticmethod
+    def typed_cell(ecls:Interpreter, kwargs:dict, address:int, type_:type) -> Number:
+        """Returns the variable at the address, raises error if it doesn't hold a type_"""
+        var = ecls.variables.at_memory(address)
+        if var is None or not isinstance(var.value, type_):
+            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        return var
+
     @staticmethod
     def value(ecls:Interpreter, kwargs:dict) -> Optional[str]:
         """Executes ? word"""
         if ecls.stack.isempty():
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
         var = ecls.stack.pop()
-        var2 = ecls.variables.at_memory(var.value)
-        if var2 is None:
-            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, int)
         return str(var2)
 
     @staticmethod
@@ -224,9 +247,7 @@ class BuiltInWord:
         if ecls.stack.size() < 2:
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
         var, val = ecls.stack.pop(2)
-        var2 = ecls.variables.at_memory(var.value)
-        if var2 is None:
-            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, int)
         var2.value = val.value
         return None
 
@@ -236,9 +257,7 @@ class BuiltInWord:
         if ecls.stack.isempty():
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
         var = ecls.stack.pop()
-        var2 = ecls.variables.at_memory(var.value)
-        if var2 is None:
-            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, int)
         ecls.stack.push(var2)
         return None
 
@@ -248,9 +267,7 @@ class BuiltInWord:
         if ecls.stack.size() < 2:
             return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
         var, val = ecls.stack.pop(2)
-        var2 = ecls.variables.at_memory(var.value)
-        if var2 is None:
-            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, int)
         var2.value += val.value
         return None
 
@@ -290,7 +307,392 @@ class BuiltInWord:
         return chr(ecls.stack.pop().value)
 
     @staticmethod
-    def key(ecls:Interpreter, _kwargs:dict) -> None:
+    def key(ecls:Interpreter, kwargs:dict) -> None:
         """Executes key word"""
+        if not ecls.limits.host_words:
+            return ecls.raise_error(kwargs["node"], Error.UnsupportedOperation)
         char = input()
         ecls.stack.push(Number(ord(char)))
+
+    @staticmethod
+    def fplus(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f+ word"""
+        if len(ecls.fstack) < 2:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        var1 = ecls.fstack.pop()
+        ecls.fstack[-1] += var1
+        return None
+
+    @staticmethod
+    def fminus(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f- word"""
+        if len(ecls.fstack) < 2:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        var1 = ecls.fstack.pop()
+        ecls.fstack[-1] -= var1
+        return None
+
+    @staticmethod
+    def fmul(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f* word"""
+        if len(ecls.fstack) < 2:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        var1 = ecls.fstack.pop()
+        ecls.fstack[-1] *= var1
+        return None
+
+    @staticmethod
+    def fdiv(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f/ word"""
+        if len(ecls.fstack) < 2:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        if ecls.fstack[-1] == 0:
+            return ecls.raise_error(kwargs["node"], Error.FloatZeroDivision)
+        var1 = ecls.fstack.pop()
+        ecls.fstack[-1] /= var1
+        return None
+
+    @staticmethod
+    def fsqrt(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes fsqrt word"""
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        if ecls.fstack[-1] < 0:
+            return ecls.raise_error(kwargs["node"], Error.FloatInvalidArgument)
+        ecls.fstack[-1] = math.sqrt(ecls.fstack[-1])
+        return None
+
+    @staticmethod
+    def fdot(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes f. word"""
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        return repr(ecls.fstack.pop())
+
+    @staticmethod
+    def show_fstack(ecls:Interpreter, _kwargs:dict) -> str:
+        """Executes f.s word"""
+        data = "".join(f" {val!r}" for val in ecls.fstack)
+        return f"<{len(ecls.fstack)}>" + data
+
+    @staticmethod
+    def fdup(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes fdup word"""
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        ecls.fpush(ecls.fstack[-1])
+        return None
+
+    @staticmethod
+    def fdrop(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes fdrop word"""
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        ecls.fstack.pop()
+        return None
+
+    @staticmethod
+    def fswap(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes fswap word"""
+        if len(ecls.fstack) < 2:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        ecls.fstack[-1], ecls.fstack[-2] = ecls.fstack[-2], ecls.fstack[-1]
+        return None
+
+    @staticmethod
+    def fput(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f@ word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        var = ecls.stack.pop()
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, float)
+        ecls.fpush(var2.value)
+        return None
+
+    @staticmethod
+    def fassign(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f! word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        var = ecls.stack.pop()
+        var2 = BuiltInWord.typed_cell(ecls, kwargs, var.value, float)
+        var2.value = ecls.fstack.pop()
+        return None
+
+    @staticmethod
+    def int_to_float(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes s>f word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        try:
+            value = float(ecls.stack.pop().value)
+        except OverflowError:
+            return ecls.raise_error(kwargs["node"], Error.FloatOutOfRange)
+        ecls.fpush(value)
+        return None
+
+    @staticmethod
+    def float_to_int(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes f>s word"""
+        if not ecls.fstack:
+            return ecls.raise_error(kwargs["node"], Error.FloatStackUnderFlow)
+        if not math.isfinite(ecls.fstack[-1]):
+            return ecls.raise_error(kwargs["node"], Error.FloatInvalidArgument)
+        return ecls.stack.push(Number(int(ecls.fstack.pop())))
+
+    @staticmethod
+    def pause(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes pause word, a task can't pause inside catch, execute or load"""
+        if ecls.current_task is not None:
+            if ecls.nesting:
+                return ecls.raise_error(kwargs["node"], Error.UnsupportedOperation)
+            ecls.current_task.paused = True
+            return None
+        output = []
+        for val in ecls.run_tasks():
+            if isinstance(val, tuple):
+                val = f"{val[0].name}: {val[1].error}"
+            output.append(val)
+        return " ".join(output)
+
+    @staticmethod
+    def activate(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes activate word, the rest of the current definition runs in the task"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        task = ecls.find_task(ecls.stack.pop().value)
+        if task is None:
+            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        frame = ecls.rstack[-1]
+        task.activate(frame[0][frame[1]:])
+        frame[1] = len(frame[0])
+        return None
+
+    @staticmethod
+    def stop(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes stop word"""
+        if ecls.current_task is None:
+            return BuiltInWord.pause(ecls, kwargs)
+        ecls.current_task.stop()
+        return None
+
+    @staticmethod
+    def block_number(ecls:Interpreter, kwargs:dict) -> Optional[int]:
+        """Pops a block number, raises error and returns None if it can't be used"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        if ecls.blocks is None:
+            return ecls.raise_error(kwargs["node"], Error.NoBlockFile)
+        number = ecls.stack.pop().value
+        if not isinstance(number, int) or number < 0:
+            return ecls.raise_error(kwargs["node"], Error.InvalidBlockNumber)
+        return number
+
+    @staticmethod
+    def block(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes block word"""
+        if (number := BuiltInWord.block_number(ecls, kwargs)) is None:
+            return None
+        return ecls.stack.push(Number(ecls.blocks.block(number)))
+
+    @staticmethod
+    def buffer(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes buffer word"""
+        if (number := BuiltInWord.block_number(ecls, kwargs)) is None:
+            return None
+        return ecls.stack.push(Number(ecls.blocks.buffer(number)))
+
+    @staticmethod
+    def update(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes update word"""
+        if ecls.blocks is None:
+            return ecls.raise_error(kwargs["node"], Error.NoBlockFile)
+        if not ecls.blocks.update():
+            return ecls.raise_error(kwargs["node"], Error.InvalidBlockNumber)
+        return None
+
+    @staticmethod
+    def save_buffers(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes save-buffers word"""
+        if ecls.blocks is None:
+            return ecls.raise_error(kwargs["node"], Error.NoBlockFile)
+        return ecls.blocks.save()
+
+    @staticmethod
+    def empty_buffers(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes empty-buffers word"""
+        if ecls.blocks is None:
+            return ecls.raise_error(kwargs["node"], Error.NoBlockFile)
+        return ecls.blocks.empty()
+
+    @staticmethod
+    def flush(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes flush word"""
+        if ecls.blocks is None:
+            return ecls.raise_error(kwargs["node"], Error.NoBlockFile)
+        return ecls.blocks.flush()
+
+    @staticmethod
+    def load(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes load word"""
+        if (number := BuiltInWord.block_number(ecls, kwargs)) is None:
+            return None
+        outer = Token.text, Error.text
+        Error.text = text = ecls.blocks.text(number)
+        try:
+            results = ecls.execute_nodes(ecls.parse(text).nodes)
+        except ForthError as exc:
+            exc.error.tok = kwargs["node"].tok
+            raise
+        finally:
+            Token.text, Error.text = outer
+        return " ".join(filter(None, results))
+
+    @staticmethod
+    def cput(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes c@ word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        buffer, offset = ecls.locate(kwargs["node"], ecls.stack.pop().value)
+        return ecls.stack.push(Number(buffer[offset]))
+
+    @staticmethod
+    def cassign(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes c! word"""
+        if ecls.stack.size() < 2:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        address, char = ecls.stack.pop(2)
+        buffer, offset = ecls.locate(kwargs["node"], address.value)
+        buffer[offset] = char.value & 0xFF
+        return None
+
+    @staticmethod
+    def tick(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes ' word, pushes the execution token of the next word"""
+        frame = ecls.rstack[-1]
+        if frame[1] >= len(frame[0]) or frame[0][frame[1]].tok.type != Token.TT_WORD:
+            return ecls.raise_error(kwargs["node"], Error.ZeroLengthName)
+        tok = frame[0][frame[1]].tok
+        frame[1] += 1
+        if not BuiltInWord.hasmethod(tok.name)[0] and tok.name not in Word.words:
+            return ecls.raise_error(frame[0][frame[1]-1], Error.UndefinedWord)
+        Word.xts[id(tok.name)] = tok
+        return ecls.stack.push(Number(id(tok.name)))
+
+    @staticmethod
+    def xt_token(ecls:Interpreter, kwargs:dict) -> Token:
+        """Pops an execution token and returns the token of its word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        tok = Word.xts.get(ecls.stack.pop().value)
+        if tok is None:
+            return ecls.raise_error(kwargs["node"], Error.InvalidMemoryAddress)
+        return tok
+
+    @staticmethod
+    def execute(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes execute word"""
+        return Word.execute(ecls, BuiltInWord.xt_token(ecls, kwargs), node=kwargs["node"])
+
+    @staticmethod
+    def catch(ecls:Interpreter, kwargs:dict) -> Optional[str]:
+        """Executes catch word, restores the stacks to their depth on a throw"""
+        tok = BuiltInWord.xt_token(ecls, kwargs)
+        mark = ecls.stack.mark()
+        fdepth = len(ecls.fstack)
+        try:
+            result = Word.execute(ecls, tok, node=kwargs["node"])
+        except Exception as exc:  # pylint: disable=W0703
+            if not isinstance(exc, ForthError):
+                exc = ecls.internal_error(kwargs["node"], exc)
+            ecls.stack.reset(mark)
+            del ecls.fstack[fdepth:]
+            ecls.stack.push(Number(exc.error.code))
+            return " ".join(exc.output) or None
+        ecls.stack.push(Number(0))
+        return result
+
+    @staticmethod
+    def throw(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes throw word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        code = ecls.stack.pop().value
+        if code == 0:
+            return None
+        return ecls.raise_error(kwargs["node"], Error.message(code), code)
+
+    @staticmethod
+    def abort(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes abort word"""
+        return ecls.raise_error(kwargs["node"], Error.Aborted)
+
+    @staticmethod
+    def type(ecls:Interpreter, kwargs:dict) -> str:
+        """Executes type word"""
+        if ecls.stack.size() < 2:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        length, address = ecls.stack.pop(2)
+        return str(ecls.memory(kwargs["node"], address.value, length.value), "utf-8", "replace")
+
+    @staticmethod
+    def count(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes count word"""
+        if ecls.stack.isempty():
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        address = ecls.stack.pop().value
+        buffer, offset = ecls.locate(kwargs["node"], address)
+        return ecls.stack.push(Number(address + 1), Number(buffer[offset]))
+
+    @staticmethod
+    def compare(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes compare word"""
+        if ecls.stack.size() < 4:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        length2, address2, length1, address1 = ecls.stack.pop(4)
+        view1 = ecls.memory(kwargs["node"], address1.value, length1.value)
+        view2 = ecls.memory(kwargs["node"], address2.value, length2.value)
+        if view1 == view2:
+            return ecls.stack.push(Number(0))
+        size = min(len(view1), len(view2))
+        if view1[:size] == view2[:size]:
+            return ecls.stack.push(Number(-1 if len(view1) < len(view2) else 1))
+        return ecls.stack.push(Number(-1 if view1[:size].tobytes() < view2[:size].tobytes() else 1))
+
+    @staticmethod
+    def search(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes search word"""
+        if ecls.stack.size() < 4:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        length2, address2, length1, address1 = ecls.stack.pop(4)
+        buffer, offset = ecls.locate(kwargs["node"], address1.value, length1.value)
+        needle = ecls.memory(kwargs["node"], address2.value, length2.value)
+        found = buffer.find(needle, offset, offset + length1.value)
+        if found == -1:
+            return ecls.stack.push(address1, length1, Number(0))
+        skipped = found - offset
+        return ecls.stack.push(Number(address1.value + skipped),
+                               Number(length1.value - skipped), Number(-1))
+
+    @staticmethod
+    def slash_string(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes /string word"""
+        if ecls.stack.size() < 3:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        amount, length, address = ecls.stack.pop(3)
+        return ecls.stack.push(Number(address.value + amount.value),
+                               Number(length.value - amount.value))
+
+    @staticmethod
+    def dash_trailing(ecls:Interpreter, kwargs:dict) -> None:
+        """Executes -trailing word"""
+        if ecls.stack.size() < 2:
+            return ecls.raise_error(kwargs["node"], Error.StackUnderFlow)
+        length, address = ecls.stack.pop(2)
+        view = ecls.memory(kwargs["node"], address.value, length.value)
+        size = len(view)
+        while size and view[size-1] == 32:
+            size -= 1
+        return ecls.stack.push(address, Number(size))